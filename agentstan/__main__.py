@@ -6,6 +6,8 @@ import argparse
 import json
 import sys
 
+from .core.jsonio import dumps
+
 
 def main():
     parser = argparse.ArgumentParser(
@@ -91,13 +93,12 @@ def _output_single(results, args):
 
     if args.output:
         with open(args.output, "w") as f:
-            json.dump(results, f, indent=2, default=str)
+            f.write(dumps(results, indent=True))
         print(f"Saved to {args.output}")
 
 
 def _output_batch(results_list, args):
     # Aggregate summaries
-    from collections import Counter
     all_types = set()
     for r in results_list:
         all_types.update(r["summary"]["final_counts"].keys())
@@ -110,7 +111,7 @@ def _output_batch(results_list, args):
 
     if args.output:
         with open(args.output, "w") as f:
-            json.dump(results_list, f, indent=2, default=str)
+            f.write(dumps(results_list, indent=True))
         print(f"Saved {len(results_list)} results to {args.output}")
 
 
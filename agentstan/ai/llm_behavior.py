@@ -228,21 +228,29 @@ class LLMBehaviorEngine:
         self._cache.clear()
         self.budget.reset_step()
 
+        llm_agents = self._llm_agents
+        if not llm_agents:
+            return
+
+        manager = simulation.agent_manager
+        environment = simulation.environment
+        # Same for every agent this step; get_counts() alone is O(N)
+        sim_state = {
+            "step": simulation.step,
+            "environment": environment.to_dict(),
+            "agent_counts": manager.get_counts(),
+        }
+
         requests = []
-        for agent in simulation.agent_manager.get_living_agents():
-            if agent.id not in self._llm_agents:
+        for agent in manager.get_living_agents():
+            info = llm_agents.get(agent.id)
+            if info is None:
                 continue
 
-            info = self._llm_agents[agent.id]
             perception_radius = agent.get_attribute("perception_radius", 5)
-            nearby = simulation.agent_manager.get_agents_near_agent(
-                agent, perception_radius, simulation.environment
+            nearby = manager.get_agents_near_agent(
+                agent, perception_radius, environment
             )
-            sim_state = {
-                "step": simulation.step,
-                "environment": simulation.environment.to_dict(),
-                "agent_counts": simulation.agent_manager.get_counts(),
-            }
 
             memory = AgentMemory.from_dict(agent.state.get("_memory", {}))
             prompt = build_agent_prompt(
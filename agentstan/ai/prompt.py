@@ -43,7 +43,7 @@ def <type>_behavior(agent, model, agents_nearby):
 
 - `agent` - the current agent. Access state with `agent['energy']`, `agent['position']`, etc. Also has `.type`, `.id`, `.alive`
 - `model` - dict with `step`, `environment`, `agent_counts`
-- `agents_nearby` - list of Agent objects within perception_radius. Access with `a['energy']`, `a.type`, `a.id`, `a.alive`
+- `agents_nearby` - list of Agent objects within perception_radius. Access with `a['energy']`, `a.type`, `a.id`, `a.alive`. It comes from a spatial index, so count or filter neighbors from it directly, e.g. `sum(1 for a in agents_nearby if a.type == 'wolf' and a.alive)`. On a `torus` grid it includes agents across the wrapped edges, so take offsets the short way round before comparing coordinates: with `w = model['environment']['dimensions']['width']`, `dx = (a['position'][0] - agent['position'][0] + w // 2) % w - w // 2` (same for y with the height)
 
 The function must return a list of action dicts.
 
@@ -7,7 +7,6 @@ a researcher turning knobs mid-experiment.
 """
 
 import json
-import copy
 import random as _random
 import logging
 from typing import Dict, Any, List, Optional
@@ -195,7 +194,7 @@ class Steerer:
                     continue
                 # Get default state from spec
                 type_spec = self.simulation.spec.get("agent_types", {}).get(agent_type, {})
-                default_state = copy.deepcopy(type_spec.get("initial_state", {"energy": 20}))
+                default_state = type_spec.get("initial_state", {"energy": 20})
                 behavior_code = type_spec.get("behavior_code", "")
 
                 for _ in range(count):
@@ -43,16 +43,14 @@ def _analyze_deaths(events: List[Dict]) -> Dict[str, Any]:
     by_cause = Counter(d.get("cause", "unknown") for d in deaths)
     by_type = Counter(d.get("agent_type", "unknown") for d in deaths)
 
-    # Death rate over time (deaths per 10-step window)
-    if deaths:
-        max_step = max(d["step"] for d in deaths)
-        window = 10
-        death_rate = []
-        for start in range(0, max_step, window):
-            count = sum(1 for d in deaths if start <= d["step"] < start + window)
-            death_rate.append({"step_range": f"{start}-{start + window}", "deaths": count})
-    else:
-        death_rate = []
+    # Death rate over time (deaths per 10-step window), bucketed in one
+    # pass rather than rescanning every death for each window
+    window = 10
+    per_window = Counter(d["step"] // window for d in deaths)
+    death_rate = [
+        {"step_range": f"{i * window}-{(i + 1) * window}", "deaths": per_window.get(i, 0)}
+        for i in range(max(per_window) + 1)
+    ]
 
     return {
         "total": len(deaths),
@@ -3,7 +3,6 @@ Action processor for handling agent actions and interactions
 """
 
 import random
-import copy
 from typing import Dict, Any, List, Optional, Callable
 from .agent import Agent, AgentManager
 from .environment import Environment
@@ -17,7 +16,8 @@ class ActionProcessor:
 
     def __init__(self, agent_manager: AgentManager, environment: Environment,
                  logger: EventLogger,
-                 behavior_resolver: Optional[Callable[[str], Optional[Callable]]] = None):
+                 behavior_resolver: Optional[Callable[[str], Optional[Callable]]] = None,
+                 behavior_compiler: Optional[Callable[[str, str], Optional[Callable]]] = None):
         """
         Initialize action processor
 
@@ -27,11 +27,29 @@ class ActionProcessor:
             logger: Event logger
             behavior_resolver: Optional callable agent_type -> behavior_function,
                 used by the transform action to look up behavior from the spec.
+            behavior_compiler: Optional callable (agent_type, behavior_code) ->
+                behavior_function, used for a transform's explicit
+                ``behavior_code``. Defaults to compiling it on every transform.
         """
         self.agent_manager = agent_manager
         self.environment = environment
         self.logger = logger
         self.behavior_resolver = behavior_resolver
+        self.behavior_compiler = behavior_compiler
+
+        # Action type -> bound handler, built once instead of walking an
+        # if/elif chain for every action
+        self._handlers: Dict[str, Callable[[Agent, Dict, int], None]] = {
+            "move": self._process_move,
+            "move_to": self._process_move_to,
+            "move_random": self._process_move_random,
+            "interact": self._process_interact,
+            "reproduce": self._process_reproduce,
+            "die": self._process_die,
+            "modify_state": self._process_modify_state,
+            "transform": self._process_transform,
+            "custom": self._process_custom,
+        }
 
     def process_actions(self, agent: Agent, actions: List[Dict[str, Any]], step: int):
         """
@@ -42,27 +60,13 @@ class ActionProcessor:
             actions: List of action dictionaries
             step: Current simulation step
         """
+        handlers = self._handlers
         for action in actions:
             action_type = action.get("type")
+            handler = handlers.get(action_type)
 
-            if action_type == "move":
-                self._process_move(agent, action, step)
-            elif action_type == "move_to":
-                self._process_move_to(agent, action, step)
-            elif action_type == "move_random":
-                self._process_move_random(agent, step)
-            elif action_type == "interact":
-                self._process_interact(agent, action, step)
-            elif action_type == "reproduce":
-                self._process_reproduce(agent, action, step)
-            elif action_type == "die":
-                self._process_die(agent, action, step)
-            elif action_type == "modify_state":
-                self._process_modify_state(agent, action, step)
-            elif action_type == "transform":
-                self._process_transform(agent, action, step)
-            elif action_type == "custom":
-                self._process_custom(agent, action, step)
+            if handler is not None:
+                handler(agent, action, step)
             else:
                 # Unknown action type, log it
                 self.logger.log_agent_action(
@@ -82,11 +86,15 @@ class ActionProcessor:
             return
 
         # Calculate new position
-        if self.environment.env_type == "grid_2d":
+        env = self.environment
+        if env.env_type == "grid_2d":
             x, y = current_pos
             dx, dy = direction if isinstance(direction, (list, tuple)) else (0, 0)
-            new_pos = (x + dx, y + dy)
-            new_pos = self.environment.normalize_position(new_pos)
+            if env.topology == "torus":
+                # Wrap inline; this is the most common action in grid models
+                new_pos = ((x + dx) % env.width, (y + dy) % env.height)
+            else:
+                new_pos = env.normalize_position((x + dx, y + dy))
 
         elif self.environment.env_type == "continuous_2d":
             x, y = current_pos
@@ -104,13 +112,14 @@ class ActionProcessor:
         agent.state["position"] = new_pos
 
         # Log the action
-        self.logger.log_agent_action(
-            step=step,
-            agent_id=agent.id,
-            agent_type=agent.type,
-            action_type="move",
-            details={"from": old_pos, "to": new_pos, "direction": direction}
-        )
+        if self.logger.logs_actions:
+            self.logger.log_agent_action(
+                step=step,
+                agent_id=agent.id,
+                agent_type=agent.type,
+                action_type="move",
+                details={"from": old_pos, "to": new_pos, "direction": direction}
+            )
 
     def _process_move_to(self, agent: Agent, action: Dict, step: int):
         """Process movement to specific target position"""
@@ -132,42 +141,51 @@ class ActionProcessor:
             dx = 1 if x2 > x1 else (-1 if x2 < x1 else 0)
             dy = 1 if y2 > y1 else (-1 if y2 < y1 else 0)
 
+            # On a torus, head across the edge when that way is shorter
+            env = self.environment
+            if env.env_type == "grid_2d" and env.topology == "torus":
+                if abs(x2 - x1) * 2 > env.width:
+                    dx = -dx
+                if abs(y2 - y1) * 2 > env.height:
+                    dy = -dy
+
             new_pos = (x1 + dx, y1 + dy)
             new_pos = self.environment.normalize_position(new_pos)
 
             old_pos = agent.state["position"]
             agent.state["position"] = new_pos
 
-            self.logger.log_agent_action(
-                step=step,
-                agent_id=agent.id,
-                agent_type=agent.type,
-                action_type="move_to",
-                details={"from": old_pos, "to": new_pos, "target": target}
-            )
+            if self.logger.logs_actions:
+                self.logger.log_agent_action(
+                    step=step,
+                    agent_id=agent.id,
+                    agent_type=agent.type,
+                    action_type="move_to",
+                    details={"from": old_pos, "to": new_pos, "target": target}
+                )
 
-    def _process_move_random(self, agent: Agent, step: int):
+    def _process_move_random(self, agent: Agent, action: Dict, step: int):
         """Process random movement"""
         current_pos = agent.state.get("position")
         if current_pos is None:
             return
 
         # Get random neighboring position
-        neighbors = self.environment.get_neighbors(current_pos, radius=1)
-        if not neighbors:
+        new_pos = self.environment.get_random_neighbor(current_pos, radius=1)
+        if new_pos is None:
             return
 
-        new_pos = random.choice(neighbors)
         old_pos = agent.state["position"]
         agent.state["position"] = new_pos
 
-        self.logger.log_agent_action(
-            step=step,
-            agent_id=agent.id,
-            agent_type=agent.type,
-            action_type="move_random",
-            details={"from": old_pos, "to": new_pos}
-        )
+        if self.logger.logs_actions:
+            self.logger.log_agent_action(
+                step=step,
+                agent_id=agent.id,
+                agent_type=agent.type,
+                action_type="move_random",
+                details={"from": old_pos, "to": new_pos}
+            )
 
     def _process_interact(self, agent: Agent, action: Dict, step: int):
         """Process interaction with another agent"""
@@ -245,20 +263,31 @@ class ActionProcessor:
         offspring_count = action.get("offspring_count", 1)
 
         # Check if agent has enough energy
-        if agent.get_attribute("energy", 0) < energy_cost:
+        energy = agent.get_attribute("energy", 0)
+        if energy < energy_cost:
             return
 
+        # Parent energy is only deducted after the loop, so every offspring
+        # starts with the same share
+        offspring_energy = energy // 2
+        position = agent.state.get("position")
+
         # Create offspring
+        brood = []
         for _ in range(offspring_count):
             offspring = agent.clone()
-            offspring.set_attribute("energy", agent.get_attribute("energy", 0) // 2)
-            offspring.set_attribute("age", 0)
+            state = offspring.state
+            state["energy"] = offspring_energy
+            state["age"] = 0
 
             # Place offspring at parent's position
-            offspring.state["position"] = agent.state.get("position")
+            state["position"] = position
+            brood.append(offspring)
 
-            self.agent_manager.add_agent(offspring)
+        # Registered in one batch rather than one add_agent call each
+        self.agent_manager.add_agents(brood)
 
+        for offspring in brood:
             self.logger.log_agent_birth(
                 step=step,
                 parent_id=agent.id,
@@ -331,16 +360,18 @@ class ActionProcessor:
         old_type = agent.type
         old_id = agent.id
 
-        # Snapshot state before mutation
-        merged_state = copy.deepcopy(agent.state)
-        merged_state.update(new_state)
+        # Shallow merge is enough: the Agent constructor copies it
+        merged_state = {**agent.state, **new_state}
 
         # Resolve behavior: action override > spec resolver
         behavior_func = None
         behavior_code = action.get("behavior_code", "")
         if behavior_code:
-            from .simulation import Simulation
-            behavior_func = Simulation._compile_behavior_function(new_type, behavior_code)
+            if self.behavior_compiler is not None:
+                behavior_func = self.behavior_compiler(new_type, behavior_code)
+            else:
+                from .simulation import Simulation
+                behavior_func = Simulation._compile_behavior_function(new_type, behavior_code)
         elif self.behavior_resolver is not None:
             behavior_func = self.behavior_resolver(new_type)
 
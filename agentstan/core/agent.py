@@ -4,16 +4,40 @@ Dynamic agent system with flexible attributes and behaviors
 
 import copy
 import logging
+import sys
 from typing import Dict, Any, List, Optional, Callable
 
 logger = logging.getLogger("agentstan")
 
+_ATOMIC_TYPES = frozenset({int, float, str, bool, type(None)})
+
+
+def snapshot_state(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Independent copy of an agent state dict.
+
+    Typical states hold only numbers, strings and position tuples, which a
+    shallow copy already isolates; deepcopy is kept for anything mutable.
+    """
+    atomic = _ATOMIC_TYPES
+    for value in state.values():
+        if type(value) in atomic:
+            continue
+        if type(value) is tuple and all(type(v) in atomic for v in value):
+            continue
+        return copy.deepcopy(state)
+    return dict(state)
+
 
 class Agent:
     """
     Dynamic agent with arbitrary attributes and behavior function
+
+    Custom attributes live in ``state``; the object itself is slotted to
+    keep large populations compact.
     """
 
+    __slots__ = ("id", "type", "alive", "state", "behavior_function")
+
     _next_id = 1
 
     def __init__(self, agent_type: str, initial_state: Dict[str, Any],
@@ -29,9 +53,11 @@ class Agent:
         self.id = Agent._next_id
         Agent._next_id += 1
 
-        self.type = agent_type
+        # Interned so type checks in behaviors (a.type == 'wolf') usually
+        # succeed on identity, even for types read back from JSON
+        self.type = sys.intern(agent_type) if type(agent_type) is str else agent_type
         self.alive = True
-        self.state = copy.deepcopy(initial_state)
+        self.state = snapshot_state(initial_state)
         self.behavior_function = behavior_function
 
         # Ensure position exists
@@ -95,7 +121,7 @@ class Agent:
         """Create a copy of this agent with new ID"""
         new_agent = Agent(
             agent_type=self.type,
-            initial_state=copy.deepcopy(self.state),
+            initial_state=self.state,
             behavior_function=self.behavior_function
         )
         return new_agent
@@ -106,7 +132,7 @@ class Agent:
             "id": self.id,
             "type": self.type,
             "alive": self.alive,
-            "state": copy.deepcopy(self.state)
+            "state": snapshot_state(self.state)
         }
 
     def __repr__(self):
@@ -119,6 +145,8 @@ class SpatialHash:
     def __init__(self, cell_size: float = 5.0):
         self.cell_size = cell_size
         self.cells: Dict[tuple, List[Agent]] = {}
+        # (width, height) when positions wrap around a torus, else None
+        self.wrap: Optional[tuple] = None
 
     def _key(self, position) -> Optional[tuple]:
         if position is None:
@@ -129,30 +157,57 @@ class SpatialHash:
             return None
         return (int(x // self.cell_size), int(y // self.cell_size))
 
-    def rebuild(self, agents: List['Agent']) -> None:
+    def rebuild(self, agents: List['Agent'], wrap: Optional[tuple] = None) -> None:
         """Rebuild the index from scratch. Call once per step."""
-        self.cells.clear()
+        cells = self.cells
+        cells.clear()
+        self.wrap = wrap
+        cs = self.cell_size
         for agent in agents:
             if not agent.alive:
                 continue
             pos = agent.state.get("position")
-            key = self._key(pos)
-            if key is None:
+            if pos is None:
                 continue
-            if key not in self.cells:
-                self.cells[key] = []
-            self.cells[key].append(agent)
+            try:
+                x, y = pos
+            except (TypeError, ValueError):
+                continue
+            # _key() inlined: one tuple and at most two dict lookups per agent
+            key = (int(x // cs), int(y // cs))
+            cell = cells.get(key)
+            if cell is None:
+                cells[key] = [agent]
+            else:
+                cell.append(agent)
+
+    def _cell_range(self, lo: float, hi: float, size: Optional[int]):
+        """Cell indices covering [lo, hi] on one axis, wrapping if size is set."""
+        cs = self.cell_size
+        if size is None or (lo >= 0 and hi < size):
+            return range(int(lo // cs), int(hi // cs) + 1)
+        last = int((size - 1) // cs)
+        if hi - lo + 1 >= size:
+            return range(last + 1)
+        lo_cell = int((lo % size) // cs)
+        hi_cell = int((hi % size) // cs)
+        if hi_cell >= lo_cell:
+            # Wrapped interval touches every column
+            return range(last + 1)
+        return list(range(lo_cell, last + 1)) + list(range(hi_cell + 1))
 
     def query(self, position, radius: float) -> List['Agent']:
-        """Return agents within radius of position."""
+        """Return agents in cells overlapping the radius around position."""
         if position is None:
             return []
-        cx, cy = self._key(position)
-        r = int(radius // self.cell_size) + 1
+        x, y = position
+        width, height = self.wrap or (None, None)
+        xs = self._cell_range(x - radius, x + radius, width)
+        ys = self._cell_range(y - radius, y + radius, height)
         result = []
-        for dx in range(-r, r + 1):
-            for dy in range(-r, r + 1):
-                cell = self.cells.get((cx + dx, cy + dy))
+        for cx in xs:
+            for cy in ys:
+                cell = self.cells.get((cx, cy))
                 if cell:
                     result.extend(cell)
         return result
@@ -161,11 +216,13 @@ class SpatialHash:
 class AgentManager:
     """Manages all agents in a simulation."""
 
-    def __init__(self):
+    def __init__(self, cell_size: float = 5.0):
         self.agents: List[Agent] = []
         self.agents_by_type: Dict[str, List[Agent]] = {}
-        self._spatial_hash = SpatialHash()
+        self._spatial_hash = SpatialHash(cell_size)
         self._agents_by_id: Dict[int, Agent] = {}
+        # node -> agents, rebuilt each step for network environments
+        self._agents_by_node: Optional[Dict[Any, List[Agent]]] = None
 
     def add_agent(self, agent: Agent):
         """Add an agent to the simulation"""
@@ -176,6 +233,21 @@ class AgentManager:
             self.agents_by_type[agent.type] = []
         self.agents_by_type[agent.type].append(agent)
 
+    def add_agents(self, agents: List[Agent]):
+        """Add several agents at once, e.g. a brood of offspring"""
+        if not agents:
+            return
+        self.agents.extend(agents)
+        by_id = self._agents_by_id
+        by_type = self.agents_by_type
+        for agent in agents:
+            by_id[agent.id] = agent
+            type_list = by_type.get(agent.type)
+            if type_list is None:
+                by_type[agent.type] = [agent]
+            else:
+                type_list.append(agent)
+
     def remove_agent(self, agent: Agent):
         """Remove an agent from the simulation"""
         if agent in self.agents:
@@ -203,35 +275,85 @@ class AgentManager:
             if a.alive and a.state.get("position") == position
         ]
 
-    def rebuild_spatial_index(self) -> None:
-        """Rebuild spatial hash. Call once per step before proximity queries."""
-        self._spatial_hash.rebuild(self.agents)
+    def rebuild_spatial_index(self, environment=None) -> None:
+        """Rebuild spatial hash. Call once per step before proximity queries.
+
+        Pass the environment so queries on a torus grid also find agents
+        across the wrap-around edges.
+        """
+        wrap = None
+        if (environment is not None and environment.env_type == "grid_2d"
+                and environment.topology == "torus"):
+            wrap = (environment.width, environment.height)
+        if environment is not None and environment.env_type == "network":
+            by_node: Dict[Any, List[Agent]] = {}
+            for agent in self.agents:
+                if agent.alive:
+                    by_node.setdefault(agent.state.get("position"), []).append(agent)
+            self._agents_by_node = by_node
+            return
+        self._agents_by_node = None
+        self._spatial_hash.rebuild(self.agents, wrap)
 
     def get_agents_near_position(self, position: Any, radius: float,
-                                 environment) -> List[Agent]:
+                                 environment,
+                                 exclude: Optional[Agent] = None) -> List[Agent]:
         """Get all living agents within radius of position.
 
         For grid_2d / continuous_2d this uses a spatial hash with Euclidean
         distance. For network environments, "radius" means graph hops and
-        candidates are taken from the BFS frontier.
+        candidates are taken from the BFS frontier. ``exclude`` is skipped
+        during the scan (used to leave out the querying agent).
         """
         if environment.env_type == "network":
             target_nodes = set(environment.get_nodes_within_hops(position, int(radius)))
             target_nodes.add(position)
+            if self._agents_by_node is None:
+                candidates = self.agents
+            else:
+                # Only visit agents indexed at the reachable nodes
+                candidates = [
+                    a for node in target_nodes
+                    for a in self._agents_by_node.get(node, ())
+                ]
             return [
-                a for a in self.agents
-                if a.alive and a.state.get("position") in target_nodes
+                a for a in candidates
+                if a.alive and a is not exclude
+                and a.state.get("position") in target_nodes
             ]
 
         candidates = self._spatial_hash.query(position, radius)
+        radius_sq = radius * radius
         nearby = []
+
+        if environment.env_type == "grid_2d" and environment.topology == "torus":
+            # Hot path for grid models (e.g. predators scanning for prey):
+            # torus distance inlined instead of a method call per candidate
+            px, py = position
+            width, height = environment.width, environment.height
+            for agent in candidates:
+                if not agent.alive or agent is exclude:
+                    continue
+                agent_pos = agent.state.get("position")
+                if agent_pos is None:
+                    continue
+                dx = abs(agent_pos[0] - px)
+                dy = abs(agent_pos[1] - py)
+                if dx > width - dx:
+                    dx = width - dx
+                if dy > height - dy:
+                    dy = height - dy
+                if dx * dx + dy * dy <= radius_sq:
+                    nearby.append(agent)
+            return nearby
+
         for agent in candidates:
-            if not agent.alive:
+            if not agent.alive or agent is exclude:
                 continue
             agent_pos = agent.state.get("position")
             if agent_pos is None:
                 continue
-            if environment.distance(position, agent_pos) <= radius:
+            if environment.distance_sq(position, agent_pos) <= radius_sq:
                 nearby.append(agent)
 
         return nearby
@@ -243,20 +365,28 @@ class AgentManager:
         if position is None:
             return []
 
-        nearby = self.get_agents_near_position(position, radius, environment)
-        # Remove the agent itself
-        return [a for a in nearby if a.id != agent.id]
+        return self.get_agents_near_position(
+            position, radius, environment, exclude=agent
+        )
 
     def cleanup_dead_agents(self):
         """Remove dead agents from active lists"""
-        dead_ids = [a.id for a in self.agents if not a.alive]
-        for aid in dead_ids:
-            self._agents_by_id.pop(aid, None)
-        self.agents = [a for a in self.agents if a.alive]
-        for agent_type in self.agents_by_type:
-            self.agents_by_type[agent_type] = [
-                a for a in self.agents_by_type[agent_type] if a.alive
-            ]
+        living = []
+        # Survivors are bucketed by type in the same sweep, so the per-type
+        # lists don't need a second pass re-checking ``alive``
+        by_type: Dict[str, List[Agent]] = {t: [] for t in self.agents_by_type}
+        died = False
+        for agent in self.agents:
+            if agent.alive:
+                living.append(agent)
+                by_type[agent.type].append(agent)
+            else:
+                self._agents_by_id.pop(agent.id, None)
+                died = True
+        if not died:
+            return
+        self.agents = living
+        self.agents_by_type = by_type
 
     def get_counts(self) -> Dict[str, int]:
         """Get count of living agents by type"""
@@ -274,7 +404,8 @@ class AgentManager:
         self.agents = []
         self.agents_by_type = {}
         self._agents_by_id = {}
-        self._spatial_hash = SpatialHash()
+        self._spatial_hash = SpatialHash(self._spatial_hash.cell_size)
+        self._agents_by_node = None
         Agent._next_id = 1
 
     def to_dict(self) -> Dict[str, Any]:
@@ -5,7 +5,8 @@ Attach a DataCollector to a Simulation to record time series of
 model-level and agent-level metrics each step.
 """
 
-from typing import Dict, Any, List, Callable, Optional
+import csv
+from typing import Dict, Any, List, Callable, Optional, TextIO
 from .agent import AgentManager
 
 
@@ -31,6 +32,9 @@ class DataCollector:
         self.agent_metrics = agent_metrics or {}
         self.model_data: List[Dict[str, Any]] = []
         self.agent_data: List[Dict[str, Any]] = []
+        # Model-level column names in first-seen order, kept up to date by
+        # collect() so exports don't rescan every row
+        self._model_columns: Dict[str, None] = {}
 
     def collect(self, simulation) -> None:
         """Collect one snapshot of data from the simulation."""
@@ -38,7 +42,8 @@ class DataCollector:
 
         # Model-level
         row = {"step": step}
-        # Always collect counts
+        # Always collect counts, live: collectors that ran earlier this
+        # step may have added or removed agents since metrics were recorded
         counts = simulation.agent_manager.get_counts()
         row["total_agents"] = simulation.agent_manager.get_total_count()
         for agent_type, count in counts.items():
@@ -51,6 +56,10 @@ class DataCollector:
             except Exception:
                 row[name] = None
         self.model_data.append(row)
+        columns = self._model_columns
+        for key in row:
+            if key not in columns:
+                columns[key] = None
 
         # Agent-level
         if self.agent_metrics:
@@ -75,7 +84,32 @@ class DataCollector:
         """Return agent-level data as list of dicts."""
         return self.agent_data
 
+    def write_csv(self, fp: TextIO, agent_level: bool = False) -> int:
+        """
+        Write model-level (or agent-level) data as CSV to an open text file.
+
+        Rows go straight through csv.writer rather than being joined into
+        one large string. Columns are every key seen, in first-seen order;
+        a missing value (e.g. a type that appeared later) is left blank.
+
+        Returns:
+            Number of data rows written
+        """
+        if agent_level:
+            rows = self.agent_data
+            fields = ["step", "agent_id", "agent_type", *self.agent_metrics]
+        else:
+            rows = self.model_data
+            fields = list(self._model_columns)
+
+        writer = csv.writer(fp)
+        writer.writerow(fields)
+        for row in rows:
+            writer.writerow([row.get(key, "") for key in fields])
+        return len(rows)
+
     def reset(self) -> None:
         """Clear collected data."""
         self.model_data = []
         self.agent_data = []
+        self._model_columns = {}
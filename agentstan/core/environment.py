@@ -4,8 +4,11 @@ Flexible environment system supporting multiple spatial types and custom propert
 
 import copy
 import random
+from math import sqrt
 from typing import Dict, Any, List, Tuple, Optional, Callable
 
+ENV_TYPES = frozenset({"grid_2d", "continuous_2d", "network", "custom"})
+
 
 class Environment:
     """
@@ -24,9 +27,16 @@ class Environment:
         """
         self.env_type = env_type
         self.dimensions = dimensions
-        self.properties = properties or {}
+        # Own copy: properties change during a run and must not leak back
+        # into a specification shared between simulations
+        self.properties = copy.deepcopy(properties) if properties else {}
         self.step = 0
 
+        # Dynamic property schedules, resolved once from their configs
+        self._cyclic: Dict[str, Tuple[int, int, List[Any]]] = {}
+        for name, config in self.properties.items():
+            self._add_schedule(name, config)
+
         # Initialize spatial structure based on type
         if env_type == "grid_2d":
             self._init_grid_2d()
@@ -45,15 +55,27 @@ class Environment:
         self.height = self.dimensions.get("height", 50)
         self.topology = self.dimensions.get("topology", "torus")  # torus or bounded
 
-        # Initialize grid cells
-        self.cells = {}
-        for x in range(self.width):
-            for y in range(self.height):
-                self.cells[(x, y)] = {
-                    "position": (x, y),
-                    "agents": [],
-                    "properties": {}
-                }
+        # Per-cell records are built on first access; positions themselves
+        # are plain (x, y) tuples on the agents.
+        self._cells: Optional[Dict[Tuple[int, int], Dict[str, Any]]] = None
+        # Power-of-two sizes wrap with a bitwise AND instead of a modulo
+        self._wrap_masks: Optional[Tuple[int, int]] = None
+        if (self.width > 0 and self.width & (self.width - 1) == 0
+                and self.height > 0 and self.height & (self.height - 1) == 0):
+            self._wrap_masks = (self.width - 1, self.height - 1)
+        # radius -> (dx, dy) offsets of the surrounding square, built once
+        self._neighbor_offsets: Dict[int, Tuple[Tuple[int, int], ...]] = {}
+
+    @property
+    def cells(self) -> Dict[Tuple[int, int], Dict[str, Any]]:
+        """Per-cell records for grid_2d environments, created lazily."""
+        if self._cells is None:
+            self._cells = {
+                (x, y): {"position": (x, y), "agents": [], "properties": {}}
+                for x in range(self.width)
+                for y in range(self.height)
+            }
+        return self._cells
 
     def _init_continuous_2d(self):
         """Initialize continuous 2D space"""
@@ -79,6 +101,7 @@ class Environment:
         for i in range(node_count):
             self.nodes[i] = {"id": i, "agents": [], "properties": {}}
             self._adjacency[i] = set()
+        self._node_ids = list(self.nodes)
 
         for pair in self.dimensions.get("edges", []) or []:
             if len(pair) == 2:
@@ -128,16 +151,24 @@ class Environment:
 
     def get_random_position(self) -> Any:
         """Get a random valid position in the environment"""
+        return self.get_random_positions(1)[0]
+
+    def get_random_positions(self, count: int) -> List[Any]:
+        """Draw ``count`` random valid positions in one call."""
         if self.env_type == "grid_2d":
-            return (random.randint(0, self.width - 1),
-                   random.randint(0, self.height - 1))
+            randrange = random.randrange
+            width, height = self.width, self.height
+            return [(randrange(width), randrange(height)) for _ in range(count)]
         elif self.env_type == "continuous_2d":
-            return (random.uniform(0, self.width),
-                   random.uniform(0, self.height))
+            uniform = random.uniform
+            width, height = self.width, self.height
+            return [(uniform(0, width), uniform(0, height)) for _ in range(count)]
         elif self.env_type == "network":
-            return random.choice(list(self.nodes.keys()))
+            choice = random.choice
+            node_ids = self._node_ids
+            return [choice(node_ids) for _ in range(count)]
         else:
-            return None
+            return [None] * count
 
     def get_neighbors(self, position: Any, radius: float = 1) -> List[Any]:
         """
@@ -161,29 +192,65 @@ class Environment:
         else:
             return []
 
+    def get_random_neighbor(self, position: Any, radius: float = 1) -> Any:
+        """
+        Pick one random neighboring position, or None if there is none.
+
+        On a torus grid, or away from the edges of a bounded one, every
+        offset is valid, so one offset is drawn directly instead of
+        building the whole neighbor list.
+        """
+        if self.env_type == "grid_2d":
+            r = int(radius)
+            if r < 1:
+                # No offsets within a radius below one cell
+                return None
+            x, y = position
+            if self.topology == "torus":
+                dx, dy = random.choice(self._grid_offsets(r))
+                return self.normalize_position((x + dx, y + dy))
+            if (self.topology == "bounded" and r <= x < self.width - r
+                    and r <= y < self.height - r):
+                dx, dy = random.choice(self._grid_offsets(r))
+                return (x + dx, y + dy)
+        neighbors = self.get_neighbors(position, radius)
+        return random.choice(neighbors) if neighbors else None
+
+    def _grid_offsets(self, radius: int) -> Tuple[Tuple[int, int], ...]:
+        """(dx, dy) offsets within a square of radius, excluding (0, 0)."""
+        offsets = self._neighbor_offsets.get(radius)
+        if offsets is None:
+            offsets = tuple(
+                (dx, dy)
+                for dx in range(-radius, radius + 1)
+                for dy in range(-radius, radius + 1)
+                if dx or dy
+            )
+            self._neighbor_offsets[radius] = offsets
+        return offsets
+
     def _get_grid_neighbors(self, position: Tuple[int, int], radius: int) -> List[Tuple[int, int]]:
         """Get grid neighbors within radius"""
         x, y = position
-        neighbors = []
-
-        for dx in range(-radius, radius + 1):
-            for dy in range(-radius, radius + 1):
-                if dx == 0 and dy == 0:
-                    continue
-
+        width, height = self.width, self.height
+        offsets = self._grid_offsets(radius)
+
+        if self.topology == "torus":
+            masks = self._wrap_masks
+            if masks is not None and type(x) is int and type(y) is int:
+                mx, my = masks
+                return [((x + dx) & mx, (y + dy) & my) for dx, dy in offsets]
+            return [((x + dx) % width, (y + dy) % height) for dx, dy in offsets]
+
+        if self.topology == "bounded":
+            neighbors = []
+            for dx, dy in offsets:
                 nx, ny = x + dx, y + dy
+                if 0 <= nx < width and 0 <= ny < height:
+                    neighbors.append((nx, ny))
+            return neighbors
 
-                # Handle topology
-                if self.topology == "torus":
-                    nx = nx % self.width
-                    ny = ny % self.height
-                elif self.topology == "bounded":
-                    if nx < 0 or nx >= self.width or ny < 0 or ny >= self.height:
-                        continue
-
-                neighbors.append((nx, ny))
-
-        return neighbors
+        return [(x + dx, y + dy) for dx, dy in offsets]
 
     def _get_network_neighbors(self, node_id: int) -> List[int]:
         """Get directly connected nodes in network (1-hop)."""
@@ -230,12 +297,14 @@ class Environment:
                 dx = min(dx, self.width - dx)
                 dy = min(dy, self.height - dy)
 
-            return (dx ** 2 + dy ** 2) ** 0.5
+            return sqrt(dx * dx + dy * dy)
 
         elif self.env_type == "continuous_2d":
             x1, y1 = pos1
             x2, y2 = pos2
-            return ((x2 - x1) ** 2 + (y2 - y1) ** 2) ** 0.5
+            dx = x2 - x1
+            dy = y2 - y1
+            return sqrt(dx * dx + dy * dy)
 
         elif self.env_type == "network":
             # Graph distance via BFS, capped at node count.
@@ -261,6 +330,36 @@ class Environment:
 
         return 0
 
+    def distance_sq(self, pos1: Any, pos2: Any) -> float:
+        """
+        Squared distance between two positions.
+
+        Cheaper than distance() when only comparing against a radius:
+        compare with radius * radius instead of taking a square root.
+        """
+        if self.env_type == "grid_2d":
+            x1, y1 = pos1
+            x2, y2 = pos2
+
+            dx = abs(x2 - x1)
+            dy = abs(y2 - y1)
+
+            if self.topology == "torus":
+                dx = min(dx, self.width - dx)
+                dy = min(dy, self.height - dy)
+
+            return dx * dx + dy * dy
+
+        elif self.env_type == "continuous_2d":
+            x1, y1 = pos1
+            x2, y2 = pos2
+            dx = x2 - x1
+            dy = y2 - y1
+            return dx * dx + dy * dy
+
+        d = self.distance(pos1, pos2)
+        return d * d
+
     def is_valid_position(self, position: Any) -> bool:
         """Check if position is valid in this environment"""
         if self.env_type == "grid_2d":
@@ -284,8 +383,15 @@ class Environment:
         """Normalize position to valid coordinates"""
         if self.env_type == "grid_2d" and self.topology == "torus":
             x, y = position
+            masks = self._wrap_masks
+            if masks is not None and type(x) is int and type(y) is int:
+                return (x & masks[0], y & masks[1])
             return (x % self.width, y % self.height)
 
+        elif self.env_type == "grid_2d" and self.topology == "bounded":
+            x, y = position
+            return (max(0, min(x, self.width - 1)), max(0, min(y, self.height - 1)))
+
         elif self.env_type == "continuous_2d" and self.bounded:
             x, y = position
             return (max(0, min(x, self.width)), max(0, min(y, self.height)))
@@ -297,8 +403,25 @@ class Environment:
         return self.properties.get(name)
 
     def set_property(self, name: str, value: Any):
-        """Set environment property value"""
+        """Set environment property value.
+
+        A plain value replaces any cyclic schedule on that property; a
+        cyclic config dict installs a new schedule.
+        """
         self.properties[name] = value
+        self._cyclic.pop(name, None)
+        self._add_schedule(name, value)
+
+    def _add_schedule(self, name: str, config: Any) -> None:
+        """Register a cyclic property config, e.g. seasons."""
+        if not (isinstance(config, dict) and config.get("type") == "cyclic"):
+            return
+        values = list(config.get("values", []))
+        if not values:
+            return
+        period = config.get("period", 100)
+        span = max(period // len(values), 1)
+        self._cyclic[name] = (period, span, values)
 
     def update(self, step: int):
         """
@@ -308,16 +431,11 @@ class Environment:
         """
         self.step = step
 
-        # Update dynamic properties
-        for prop_name, prop_config in list(self.properties.items()):
-            if isinstance(prop_config, dict) and "type" in prop_config:
-                if prop_config["type"] == "cyclic":
-                    # Cyclic properties (e.g., seasons)
-                    period = prop_config.get("period", 100)
-                    values = prop_config.get("values", [])
-                    if values:
-                        index = (step % period) // (period // len(values))
-                        self.properties[prop_name] = values[index % len(values)]
+        # Update dynamic properties (e.g., seasons)
+        properties = self.properties
+        for prop_name, (period, span, values) in self._cyclic.items():
+            index = (step % period) // span
+            properties[prop_name] = values[index % len(values)]
 
     def to_dict(self) -> Dict[str, Any]:
         """Export environment state as dictionary"""
@@ -6,11 +6,12 @@ that are safely applied between simulation steps.
 """
 
 import threading
-import copy
 import logging
 from dataclasses import dataclass, field
 from typing import Dict, Any, List, Optional, Callable, Tuple
 
+from .agent import Agent
+
 logger = logging.getLogger("agentstan")
 
 
@@ -128,15 +129,16 @@ class InterventionEngine:
         p = intervention.params
 
         if intervention.type == "add_agent":
-            from .agent import Agent
             behavior_func = None
             if p.get("behavior_code"):
-                behavior_func = sim._compile_behavior_function(
+                behavior_func = sim.compile_behavior(
                     p["agent_type"], p["behavior_code"]
                 )
+            # Agent.__init__ copies the state; queued dicts may be
+            # shared between several add_agent interventions
             agent = Agent(
                 agent_type=p["agent_type"],
-                initial_state=copy.deepcopy(p["state"]),
+                initial_state=p["state"],
                 behavior_function=behavior_func,
             )
             if p.get("position"):
@@ -0,0 +1,48 @@
+"""
+JSON encoding for simulation output.
+
+Uses orjson when it is installed (``pip install agentstan[fast]``) and
+falls back to the standard library otherwise. Either way the result is
+a str, and values JSON can't represent are written with str().
+"""
+
+import json
+import math
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # optional speedup
+    orjson = None
+
+
+def _has_non_finite(obj: Any) -> bool:
+    """Whether obj holds a NaN or infinite float anywhere inside it."""
+    if isinstance(obj, float):
+        return not math.isfinite(obj)
+    if isinstance(obj, dict):
+        return any(_has_non_finite(v) for v in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return any(_has_non_finite(v) for v in obj)
+    return False
+
+
+def dumps(obj: Any, indent: bool = False) -> str:
+    """Serialize obj to a JSON string, pretty-printed with 2 spaces if indent."""
+    if orjson is not None:
+        # Datetimes and dataclasses go through default=str, as with json
+        option = (orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+                  | orjson.OPT_PASSTHROUGH_DATACLASS)
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        try:
+            encoded = orjson.dumps(obj, default=str, option=option)
+        except TypeError:
+            # e.g. integers beyond 64 bits; the stdlib handles those
+            pass
+        else:
+            # orjson writes NaN and infinities as null, which would make
+            # checkpoints lossy; the stdlib keeps them (NaN, Infinity)
+            if b"null" not in encoded or not _has_non_finite(obj):
+                return encoded.decode()
+    return json.dumps(obj, indent=2 if indent else None, default=str)
@@ -5,8 +5,14 @@ Tracks all agent actions, interactions, state changes, and system events
 for detailed post-simulation analysis.
 """
 
+import csv
 import time
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, TextIO
+
+from .jsonio import dumps
+
+# Keys every event has; they lead each CSV row under fixed column names
+_BASE_KEYS = frozenset(("step", "timestamp", "type"))
 
 
 class EventLogger:
@@ -50,6 +56,14 @@ class EventLogger:
 
         self.events.append(event)
 
+    @property
+    def logs_actions(self) -> bool:
+        """Whether log_agent_action() records anything at the current settings.
+
+        Lets hot callers skip building the details dict for a dropped event.
+        """
+        return self.enabled and self.log_level != "minimal"
+
     def log_agent_action(self, step: int, agent_id: int, agent_type: str,
                         action_type: str, details: Optional[Dict] = None):
         """Log an agent performing an action"""
@@ -186,6 +200,22 @@ class EventLogger:
         """Export events as JSON-serializable list"""
         return self.events.copy()
 
+    def write_jsonl(self, fp: TextIO) -> int:
+        """
+        Stream events to an open text file, one JSON object per line.
+
+        Writes incrementally instead of building the full list or one
+        large JSON string in memory.
+
+        Returns:
+            Number of events written
+        """
+        write = fp.write
+        for event in self.events:
+            write(dumps(event))
+            write("\n")
+        return len(self.events)
+
     def export_csv_data(self) -> List[Dict]:
         """
         Export events in flattened format suitable for CSV
@@ -194,6 +224,7 @@ class EventLogger:
             List of flat dictionaries (one per event)
         """
         csv_data = []
+        append = csv_data.append
 
         for event in self.events:
             flat_event = {
@@ -204,13 +235,39 @@ class EventLogger:
 
             # Add event-specific fields
             for key, value in event.items():
-                if key not in ["step", "timestamp", "type"]:
-                    # Convert complex types to strings
-                    if isinstance(value, (list, dict)):
-                        flat_event[key] = str(value)
-                    else:
-                        flat_event[key] = value
+                if key in _BASE_KEYS:
+                    continue
+                # Convert complex types to strings
+                if isinstance(value, (list, dict)):
+                    flat_event[key] = str(value)
+                else:
+                    flat_event[key] = value
 
-            csv_data.append(flat_event)
+            append(flat_event)
 
         return csv_data
+
+    def write_csv(self, fp: TextIO) -> int:
+        """
+        Write the flattened events (see export_csv_data) as CSV to an open
+        text file.
+
+        The header is worked out once up front: the fixed columns, then
+        every other key in first-seen order. Fields an event lacks are
+        left blank.
+
+        Returns:
+            Number of events written
+        """
+        rows = self.export_csv_data()
+        columns = {"step": None, "timestamp": None, "event_type": None}
+        for row in rows:
+            for key in row:
+                if key not in columns:
+                    columns[key] = None
+        fields = list(columns)
+
+        writer = csv.writer(fp)
+        writer.writerow(fields)
+        writer.writerows([row.get(key, "") for key in fields] for row in rows)
+        return len(rows)
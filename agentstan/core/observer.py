@@ -2,9 +2,9 @@
 Observation system for rich per-agent simulation snapshots.
 """
 
-import copy
-from typing import Dict, Any, List, Optional, Callable
-from .agent import Agent, AgentManager
+from collections import deque
+from typing import Deque, Dict, Any, List, Optional, Callable
+from .agent import Agent, AgentManager, snapshot_state
 
 
 class AgentSnapshot:
@@ -61,7 +61,7 @@ class AgentSnapshot:
             agent_id=agent.id,
             agent_type=agent.type,
             step=step,
-            state=copy.deepcopy(agent.state),
+            state=snapshot_state(agent.state),
             position=position,
             alive=agent.alive,
             nearby=nearby,
@@ -108,8 +108,9 @@ class SimulationSnapshot:
     @staticmethod
     def from_simulation(sim, agent_ids: Optional[List[int]] = None) -> "SimulationSnapshot":
         agents = {}
+        wanted = frozenset(agent_ids) if agent_ids is not None else None
         for agent in sim.agent_manager.get_living_agents():
-            if agent_ids and agent.id not in agent_ids:
+            if wanted is not None and agent.id not in wanted:
                 continue
             agents[agent.id] = AgentSnapshot.from_agent(
                 agent, sim.step, sim.environment, sim.agent_manager
@@ -139,7 +140,8 @@ class Observer:
         self.watch_types = watch_types
         self.every_n_steps = every_n_steps
         self.max_history = max_history
-        self.history: List[SimulationSnapshot] = []
+        # Bounded ring buffer: the oldest snapshot drops off in O(1)
+        self.history: Deque[SimulationSnapshot] = deque(maxlen=max_history)
         self.callbacks: List[Callable[["SimulationSnapshot"], None]] = []
 
     def collect(self, simulation) -> None:
@@ -152,18 +154,15 @@ class Observer:
         if self.watch_agents:
             agent_ids = self.watch_agents
         elif self.watch_types:
+            watch_types = frozenset(self.watch_types)
             agent_ids = [
                 a.id for a in simulation.agent_manager.get_living_agents()
-                if a.type in self.watch_types
+                if a.type in watch_types
             ]
 
         snapshot = SimulationSnapshot.from_simulation(simulation, agent_ids)
         self.history.append(snapshot)
 
-        # Evict oldest if over cap
-        if len(self.history) > self.max_history:
-            self.history = self.history[-self.max_history:]
-
         for cb in self.callbacks:
             cb(snapshot)
 
@@ -2,19 +2,43 @@
 Core simulation engine.
 """
 
-import copy
+import functools
+import json
+import math
+import random
 import time
 import logging
+from types import CodeType, MappingProxyType
 from typing import Dict, Any, List, Optional, Callable
 
-from .environment import Environment
+from .environment import Environment, ENV_TYPES
 from .agent import Agent, AgentManager
 from .actions import ActionProcessor
 from .logger import EventLogger
+from .jsonio import dumps
 from .scheduler import RandomScheduler
 
 log = logging.getLogger("agentstan")
 
+# Builtins visible to behavior code. Built once and shared by every
+# compiled behavior, so it is read-only to keep behaviors from altering it.
+_SAFE_BUILTINS = MappingProxyType({
+    "abs": abs, "len": len, "max": max, "min": min,
+    "sum": sum, "range": range, "enumerate": enumerate,
+    "list": list, "dict": dict, "str": str, "int": int,
+    "float": float, "bool": bool, "any": any, "all": all,
+    "sorted": sorted, "reversed": reversed, "round": round,
+    "zip": zip, "map": map, "filter": filter, "tuple": tuple,
+    "set": set, "True": True, "False": False, "None": None,
+    "isinstance": isinstance, "print": print,
+})
+
+
+@functools.lru_cache(maxsize=256)
+def _compile_source(behavior_code: str) -> CodeType:
+    """Compile behavior source once; batch runs and transforms reuse it."""
+    return compile(behavior_code, "<behavior>", "exec")
+
 
 class Simulation:
     """
@@ -26,16 +50,29 @@ class Simulation:
     """
 
     def __init__(self, specification: Dict[str, Any], scheduler=None):
+        self._setup(specification, scheduler)
+        self._create_agents()
+        self.metrics = {
+            "initial_agents": self.agent_manager.get_total_count(),
+            "initial_counts": self.agent_manager.get_counts(),
+            "history": [],
+        }
+
+    def _setup(self, specification: Dict[str, Any], scheduler=None) -> None:
+        """Build everything except the agents; shared by __init__ and load()."""
         self._validate_spec(specification)
         self.spec = specification
         self.step = 0
         self.scheduler = scheduler or RandomScheduler()
         self.collectors = []
         self._behavior_cache: Dict[str, Optional[Callable]] = {}
+        # (agent_type, behavior_code) -> function, for code arriving at
+        # runtime through transform actions and interventions
+        self._runtime_behaviors: Dict[tuple, Optional[Callable]] = {}
 
         # Initialize core systems
         self.environment = self._create_environment()
-        self.agent_manager = AgentManager()
+        self.agent_manager = AgentManager(cell_size=self._spatial_cell_size())
         self.logger = EventLogger(
             enabled=True,
             log_level=specification.get("log_level", "normal"),
@@ -43,20 +80,13 @@ class Simulation:
         self.action_processor = ActionProcessor(
             self.agent_manager, self.environment, self.logger,
             behavior_resolver=self.get_behavior,
+            behavior_compiler=self.compile_behavior,
         )
 
-        self._create_agents()
-
         # Optional systems (attached after init)
         self.intervention_engine = None
         self.llm_engine = None
 
-        self.metrics = {
-            "initial_agents": self.agent_manager.get_total_count(),
-            "initial_counts": self.agent_manager.get_counts(),
-            "history": [],
-        }
-
     def add_collector(self, collector) -> None:
         """Attach a DataCollector to this simulation."""
         self.collectors.append(collector)
@@ -86,8 +116,15 @@ class Simulation:
             )
 
         env = spec["environment"]
+        if not isinstance(env, dict):
+            raise ValueError(f"environment must be a dict, got {type(env).__name__}")
         if "type" not in env:
             raise ValueError("environment missing 'type'. Options: 'grid_2d', 'continuous_2d', 'network'")
+        if not isinstance(env["type"], str) or env["type"] not in ENV_TYPES:
+            raise ValueError(
+                f"Unknown environment type {env['type']!r}. "
+                "Options: 'grid_2d', 'continuous_2d', 'network', 'custom'"
+            )
         if "dimensions" not in env:
             raise ValueError("environment missing 'dimensions'. Expected: {'width': N, 'height': N}")
 
@@ -110,6 +147,25 @@ class Simulation:
             if not isinstance(count, int) or count < 0:
                 raise ValueError(f"agent_types['{name}'].initial_count must be a non-negative integer, got {count}")
 
+    def _spatial_cell_size(self) -> float:
+        """Spatial hash cell size matched to the commonest perception radius.
+
+        With cells as wide as the radius, most proximity queries touch a
+        3x3 block of cells. Small radii (e.g. Schelling neighborhoods) no
+        longer wade through cells sized for the default radius of 5.
+        """
+        agents_per_radius: Dict[float, int] = {}
+        for type_spec in self.spec.get("agent_types", {}).values():
+            radius = type_spec.get("initial_state", {}).get("perception_radius", 5)
+            if isinstance(radius, (int, float)) and radius > 0:
+                agents_per_radius[radius] = (
+                    agents_per_radius.get(radius, 0) + type_spec.get("initial_count", 0)
+                )
+        if not agents_per_radius:
+            return 5.0
+        radius = max(agents_per_radius, key=agents_per_radius.get)
+        return max(float(radius), 1.0)
+
     def _create_environment(self) -> Environment:
         env_spec = self.spec.get("environment", {})
         return Environment.from_dict(env_spec)
@@ -122,15 +178,20 @@ class Simulation:
             initial_state = type_spec.get("initial_state", {})
             behavior_func = self.get_behavior(agent_type)
 
-            for _ in range(initial_count):
-                agent = Agent(
+            # Agent.__init__ copies initial_state, so no copy here
+            agents = [
+                Agent(
                     agent_type=agent_type,
-                    initial_state=copy.deepcopy(initial_state),
+                    initial_state=initial_state,
                     behavior_function=behavior_func,
                 )
-                if agent.state.get("position") is None:
-                    agent.state["position"] = self.environment.get_random_position()
-                self.agent_manager.add_agent(agent)
+                for _ in range(initial_count)
+            ]
+            unplaced = [a for a in agents if a.state.get("position") is None]
+            positions = self.environment.get_random_positions(len(unplaced))
+            for agent, position in zip(unplaced, positions):
+                agent.state["position"] = position
+            self.agent_manager.add_agents(agents)
 
     def get_behavior(self, agent_type: str) -> Optional[Callable]:
         """Resolve a behavior function for an agent type from the spec, cached."""
@@ -145,30 +206,31 @@ class Simulation:
         self._behavior_cache[agent_type] = func
         return func
 
+    def compile_behavior(self, agent_type: str, behavior_code: str) -> Optional[Callable]:
+        """Compile behavior code supplied at runtime, cached per simulation.
+
+        Transforms and interventions that repeat the same code reuse one
+        function instead of exec'ing the source again for every agent.
+        """
+        key = (agent_type, behavior_code)
+        if key not in self._runtime_behaviors:
+            self._runtime_behaviors[key] = self._compile_behavior_function(
+                agent_type, behavior_code
+            )
+        return self._runtime_behaviors[key]
+
     @staticmethod
     def _compile_behavior_function(
         agent_type: str, behavior_code: str
     ) -> Optional[Callable]:
         try:
-            import random
-            import math
-
             namespace = {
-                "__builtins__": {
-                    "abs": abs, "len": len, "max": max, "min": min,
-                    "sum": sum, "range": range, "enumerate": enumerate,
-                    "list": list, "dict": dict, "str": str, "int": int,
-                    "float": float, "bool": bool, "any": any, "all": all,
-                    "sorted": sorted, "reversed": reversed, "round": round,
-                    "zip": zip, "map": map, "filter": filter, "tuple": tuple,
-                    "set": set, "True": True, "False": False, "None": None,
-                    "isinstance": isinstance, "print": print,
-                },
+                "__builtins__": _SAFE_BUILTINS,
                 "random": random,
                 "math": math,
             }
 
-            exec(behavior_code, namespace)
+            exec(_compile_source(behavior_code), namespace)
 
             func_name = f"{agent_type}_behavior"
             if func_name in namespace:
@@ -193,7 +255,7 @@ class Simulation:
             self.intervention_engine.apply_pending()
 
         # Rebuild spatial index for fast proximity queries
-        self.agent_manager.rebuild_spatial_index()
+        self.agent_manager.rebuild_spatial_index(self.environment)
 
         # Pre-compute LLM agent decisions in batch
         if self.llm_engine:
@@ -202,25 +264,39 @@ class Simulation:
         agents = self.scheduler.get_agents(self.agent_manager)
         simultaneous = getattr(self.scheduler, "simultaneous", False)
 
+        # Built once per step rather than per agent: counting agents is
+        # O(N), so doing it for every agent made each step O(N^2).
+        # Counts therefore reflect the population at the start of the step.
+        sim_state = {
+            "step": self.step,
+            "environment": self.environment.to_dict(),
+            "agent_counts": self.agent_manager.get_counts(),
+        }
+
+        # Bound once: the loops below run once per agent
+        step = self.step
+        decide = self._get_agent_actions
+        process = self.action_processor.process_actions
+
         if simultaneous:
             # Collect all actions first, then process
             all_actions = []
             for agent in agents:
                 if not agent.alive:
                     continue
-                actions = self._get_agent_actions(agent)
+                actions = decide(agent, sim_state)
                 if actions:
                     all_actions.append((agent, actions))
             for agent, actions in all_actions:
                 if agent.alive:
-                    self.action_processor.process_actions(agent, actions, self.step)
+                    process(agent, actions, step)
         else:
             for agent in agents:
                 if not agent.alive:
                     continue
-                actions = self._get_agent_actions(agent)
+                actions = decide(agent, sim_state)
                 if actions:
-                    self.action_processor.process_actions(agent, actions, self.step)
+                    process(agent, actions, step)
 
         self._apply_global_functions()
         self.agent_manager.cleanup_dead_agents()
@@ -230,21 +306,25 @@ class Simulation:
         for collector in self.collectors:
             collector.collect(self)
 
-    def _get_agent_actions(self, agent: Agent) -> List[Dict[str, Any]]:
-        perception_radius = agent.get_attribute("perception_radius", 5)
+    def _get_agent_actions(self, agent: Agent,
+                           sim_state: Dict[str, Any]) -> List[Dict[str, Any]]:
+        perception_radius = agent.state.get("perception_radius", 5)
         agents_nearby = self.agent_manager.get_agents_near_agent(
             agent, perception_radius, self.environment
         )
-        sim_state = {
-            "step": self.step,
-            "environment": self.environment.to_dict(),
-            "agent_counts": self.agent_manager.get_counts(),
-        }
-        return agent.execute_behavior(sim_state, agents_nearby)
+        # Fresh top level and agent_counts per agent, so a behavior that
+        # writes into its model dict or the counts cannot affect the
+        # agents after it (as when the state was rebuilt per agent). The
+        # environment dict still shares the live dimensions/properties.
+        model = dict(sim_state)
+        model["agent_counts"] = dict(sim_state["agent_counts"])
+        return agent.execute_behavior(model, agents_nearby)
 
     def _apply_global_functions(self):
-        for agent in self.agent_manager.get_living_agents():
-            energy = agent.get_attribute("energy", None)
+        for agent in self.agent_manager.agents:
+            if not agent.alive:
+                continue
+            energy = agent.state.get("energy")
             if energy is not None and energy <= 0:
                 agent.kill()
                 self.logger.log_agent_death(
@@ -255,21 +335,41 @@ class Simulation:
                 )
 
     def _record_metrics(self):
-        counts = self.agent_manager.get_counts()
-        total = self.agent_manager.get_total_count()
+        # Called straight after cleanup_dead_agents, so the per-type lists
+        # hold only living agents and their lengths are the counts
+        counts = {
+            agent_type: len(agents)
+            for agent_type, agents in self.agent_manager.agents_by_type.items()
+        }
+        # Every living agent is counted under exactly one type
+        total = sum(counts.values())
         self.metrics["history"].append({
             "step": self.step,
             "agent_counts": counts,
             "total_agents": total,
         })
 
+    def _counts_after_step(self):
+        """Living (counts by type, total) once the step's collectors have run.
+
+        run_step records counts before the collectors, which may add or
+        kill agents, so the record is reused only when there are none.
+        """
+        history = self.metrics["history"]
+        if not self.collectors and history and history[-1]["step"] == self.step:
+            recorded = history[-1]
+            return recorded["agent_counts"], recorded["total_agents"]
+        counts = self.agent_manager.get_counts()
+        # Every living agent is counted under exactly one type
+        return counts, sum(counts.values())
+
     def run(self, steps: int) -> Dict[str, Any]:
         """Run simulation for N steps. Returns results dict."""
         start_time = time.time()
 
         for _ in range(steps):
             self.run_step()
-            if self.agent_manager.get_total_count() == 0:
+            if self._counts_after_step()[1] == 0:
                 break
 
         return {
@@ -288,14 +388,22 @@ class Simulation:
         }
 
     def run_stream(self, steps: int, delay: float = 0.1, callback: Optional[Callable] = None):
-        """Run simulation yielding state each step."""
+        """Run simulation yielding state each step.
+
+        Steps are paced on a fixed schedule of one every ``delay`` seconds,
+        so the time spent computing a step (and by the consumer) counts
+        toward the delay instead of adding to it.
+        """
+        next_tick = time.monotonic()
         for _ in range(steps):
             self.run_step()
 
+            # Copied so consumers can't edit the metrics history
+            counts, total = self._counts_after_step()
             state = {
                 "step": self.step,
-                "agent_counts": self.agent_manager.get_counts(),
-                "total_agents": self.agent_manager.get_total_count(),
+                "agent_counts": dict(counts),
+                "total_agents": total,
                 "environment": self.environment.properties,
             }
 
@@ -303,10 +411,17 @@ class Simulation:
                 callback(state)
             yield state
 
-            if self.agent_manager.get_total_count() == 0:
+            if total == 0:
                 break
             if delay > 0:
-                time.sleep(delay)
+                next_tick += delay
+                slack = next_tick - time.monotonic()
+                if slack > 0:
+                    time.sleep(slack)
+                else:
+                    # Running behind: start afresh rather than bursting
+                    # through steps to catch up
+                    next_tick = time.monotonic()
 
     def get_state(self) -> Dict[str, Any]:
         return {
@@ -318,7 +433,6 @@ class Simulation:
 
     def save(self, path: str) -> None:
         """Save simulation state to a JSON file for later resuming."""
-        import json
         checkpoint = {
             "spec": self.spec,
             "step": self.step,
@@ -330,40 +444,48 @@ class Simulation:
             "metrics": self.metrics,
         }
         with open(path, "w") as f:
-            json.dump(checkpoint, f, indent=2, default=str)
+            f.write(dumps(checkpoint, indent=True))
 
     @classmethod
     def load(cls, path: str) -> "Simulation":
-        """Load a saved simulation and resume from where it left off."""
-        import json
-        import copy
-        from .agent import Agent
+        """Load a saved simulation and resume from where it left off.
 
+        The simulation is built with _setup() rather than __init__, which
+        would create the spec's initial population only for it to be
+        replaced; the agents come from the checkpoint instead. Subclasses
+        that add state should do so in _setup() to have it on load.
+        """
         with open(path) as f:
             checkpoint = json.load(f)
 
-        sim = cls(checkpoint["spec"])
+        sim = cls.__new__(cls)
+        sim._setup(checkpoint["spec"])
 
         # Restore step counter
         sim.step = checkpoint["step"]
 
-        # Restore agents from checkpoint (replacing the ones __init__ created)
+        # Restore agents from checkpoint; reset() restarts the ID counter
         sim.agent_manager.reset()
-        Agent._next_id = 1
 
         for agent_data in checkpoint["agents"]:
             agent_type = agent_data["type"]
             agent = Agent(
                 agent_type=agent_type,
-                initial_state=copy.deepcopy(agent_data["state"]),
+                initial_state={},
                 behavior_function=sim.get_behavior(agent_type),
             )
+            # The state was just parsed from JSON and nothing else holds it,
+            # so adopt it rather than paying for the constructor's copy
+            agent.state = agent_data["state"]
+            agent.state.setdefault("position", None)
             agent.alive = agent_data["alive"]
             sim.agent_manager.add_agent(agent)
 
-        # Restore environment properties
-        for k, v in checkpoint.get("environment_properties", {}).items():
-            sim.environment.set_property(k, v)
+        # Restore environment properties; cyclic schedules from the spec
+        # keep running, so write the values directly
+        sim.environment.properties.update(
+            checkpoint.get("environment_properties", {})
+        )
 
         # Restore metrics
         sim.metrics = checkpoint["metrics"]
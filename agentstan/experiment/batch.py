@@ -3,22 +3,20 @@ Batch runner: run the same model many times with parameter variations.
 """
 
 import copy
-import json
 from typing import Dict, Any, List, Optional
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 
+from ..core.jsonio import dumps
 from ..core.simulation import Simulation
 
 
-def _set_nested(d: dict, path: str, value: Any) -> dict:
-    """Set a nested dict value by dot-path. e.g. 'agent_types.wolf.initial_count'."""
-    out = copy.deepcopy(d)
+def _set_nested(d: dict, path: str, value: Any) -> None:
+    """Set a nested dict value in place by dot-path. e.g. 'agent_types.wolf.initial_count'."""
     keys = path.split(".")
-    target = out
+    target = d
     for key in keys[:-1]:
         target = target[key]
     target[keys[-1]] = value
-    return out
 
 
 def _run_one(spec: dict, steps: int, run_id: int, params: dict) -> Dict[str, Any]:
@@ -42,6 +40,7 @@ def batch_run(
     vary: Optional[Dict[str, list]] = None,
     max_workers: int = 4,
     output_file: Optional[str] = None,
+    processes: bool = False,
 ) -> List[Dict[str, Any]]:
     """
     Run a model many times, optionally varying parameters.
@@ -53,7 +52,12 @@ def batch_run(
         vary: Dict mapping dot-path params to lists of values.
               e.g. {"agent_types.wolf.initial_count": [5, 10, 15, 20]}
               If None, runs the same spec n_runs times.
-        max_workers: Parallel threads.
+        max_workers: Parallel threads (or processes).
+        output_file: Optional JSONL path; each run's summary is streamed
+            there and its history dropped from the returned result.
+        processes: Run in worker processes instead of threads. Simulations
+            are pure Python, so threads share one core under the GIL;
+            processes scale with cores. Specs must be picklable.
 
     Returns:
         List of result dicts, each with run_id, params, summary, history.
@@ -77,17 +81,20 @@ def batch_run(
                     new_combos.append(new_combo)
             param_combos = new_combos
 
+        # One copy per combination; Simulation never mutates its spec, so
+        # the replicates of a combination share it.
         run_id = 0
         for combo in param_combos:
             modified_spec = copy.deepcopy(spec)
             for path, val in combo.items():
-                modified_spec = _set_nested(modified_spec, path, val)
+                _set_nested(modified_spec, path, val)
             for _ in range(n_runs):
                 jobs.append((modified_spec, steps, run_id, combo))
                 run_id += 1
     else:
+        shared_spec = copy.deepcopy(spec)
         for run_id in range(n_runs):
-            jobs.append((copy.deepcopy(spec), steps, run_id, {}))
+            jobs.append((shared_spec, steps, run_id, {}))
 
     # Execute
     results = []
@@ -95,7 +102,8 @@ def batch_run(
     if output_file:
         out_file = open(output_file, "w")
 
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+    executor_cls = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    with executor_cls(max_workers=max_workers) as executor:
         futures = {
             executor.submit(_run_one, s, st, rid, p): rid
             for s, st, rid, p in jobs
@@ -104,7 +112,6 @@ def batch_run(
             result = future.result()
             if out_file:
                 # Stream to JSONL — don't hold history in memory
-                import json
                 compact = {
                     "run_id": result["run_id"],
                     "params": result["params"],
@@ -112,7 +119,7 @@ def batch_run(
                     "final_step": result["final_step"],
                     "duration": result["duration"],
                 }
-                out_file.write(json.dumps(compact, default=str) + "\n")
+                out_file.write(dumps(compact) + "\n")
                 # Strip history from in-memory result to save RAM
                 result.pop("history", None)
             results.append(result)
@@ -13,6 +13,7 @@ def sweep(
     steps: int = 200,
     n_runs: int = 10,
     max_workers: int = 4,
+    processes: bool = False,
 ) -> Dict[Any, List[Dict[str, Any]]]:
     """
     Sweep a single parameter across values with replications.
@@ -23,7 +24,8 @@ def sweep(
         values: List of values to try.
         steps: Steps per run.
         n_runs: Replications per value.
-        max_workers: Parallel threads.
+        max_workers: Parallel threads (or processes).
+        processes: Run in worker processes instead of threads; see batch_run.
 
     Returns:
         Dict mapping each value to a list of run results.
@@ -41,6 +43,7 @@ def sweep(
         steps=steps,
         vary={param: list(values)},
         max_workers=max_workers,
+        processes=processes,
     )
 
     # Group by parameter value
@@ -10,7 +10,6 @@ Wraps the full agentstan library in a REST API.
 import os
 import uuid
 import time
-import copy
 import json
 import threading
 import logging
@@ -168,7 +167,7 @@ def create_app(cors_origins=None, api_key=None):
                     agent_type = i.get("agent_type")
                     count = min(i.get("count", 1), 50)
                     type_spec = sim.spec.get("agent_types", {}).get(agent_type, {})
-                    state = copy.deepcopy(type_spec.get("initial_state", {"energy": 20}))
+                    state = type_spec.get("initial_state", {"energy": 20})
                     code = type_spec.get("behavior_code", "")
                     for _ in range(count):
                         sim.intervention_engine.add_agent(agent_type, state, behavior_code=code, source="api")
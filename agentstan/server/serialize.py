@@ -4,7 +4,6 @@ Clean JSON serialization for API responses.
 Ensures all simulation output is json.dumps() safe without default=str hacks.
 """
 
-import copy
 from typing import Dict, Any
 
 
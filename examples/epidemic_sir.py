@@ -10,6 +10,7 @@ herd immunity builds. Try varying infection_rate and recovery_time.
 """
 
 from agentstan import Simulation, DataCollector
+from agentstan.core.agent import Agent
 from agentstan.experiment import sweep
 
 susceptible_code = """
@@ -103,8 +104,6 @@ class SIRTransitionCollector:
             if agent.get_attribute("_become_recovered"):
                 to_recover.append(agent)
 
-        from agentstan.core.agent import Agent
-
         for agent in to_infect:
             # Create infected agent at same position
             new_agent = Agent(
@@ -115,7 +114,7 @@ class SIRTransitionCollector:
                     "days_infected": 0,
                     "recovery_time": 14,
                 },
-                behavior_function=simulation._compile_behavior_function("infected", infected_code),
+                behavior_function=simulation.compile_behavior("infected", infected_code),
             )
             simulation.agent_manager.add_agent(new_agent)
             agent.kill()
@@ -127,7 +126,7 @@ class SIRTransitionCollector:
                     "position": agent.get_attribute("position"),
                     "perception_radius": 2,
                 },
-                behavior_function=simulation._compile_behavior_function("recovered", recovered_code),
+                behavior_function=simulation.compile_behavior("recovered", recovered_code),
             )
             simulation.agent_manager.add_agent(new_agent)
             agent.kill()
@@ -163,7 +162,10 @@ def run_single():
 
     print(f"Peak infection: {peak_infected['I']} at step {peak_infected['step']}")
     print(f"Final: S={data[-1]['S']}, I={data[-1]['I']}, R={data[-1]['R']}")
-    print(f"Attack rate: {data[-1]['R'] / 300:.0%} infected over the epidemic")
+    final = data[-1]
+    population = final["S"] + final["I"] + final["R"]
+    attack_rate = final["R"] / population if population else 0.0
+    print(f"Attack rate: {attack_rate:.0%} infected over the epidemic")
     print()
 
     # Print SIR curve
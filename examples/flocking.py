@@ -13,45 +13,62 @@ Uses continuous-like movement on a grid.
 from agentstan import Simulation, DataCollector
 
 behavior_code = """
+# Every unit step including standing still, so a random move is one draw
+STEPS = tuple((dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1))
+
 def bird_behavior(agent, model, agents_nearby):
     actions = []
     position = agent['position']
 
     if not agents_nearby:
         # No neighbors: move randomly
-        actions.append({'type': 'move', 'direction': [random.choice([-1,0,1]), random.choice([-1,0,1])]})
+        actions.append({'type': 'move', 'direction': random.choice(STEPS)})
         return actions
 
-    # Compute neighbor statistics
-    flock = [a for a in agents_nearby if a.alive]
-    if not flock:
-        actions.append({'type': 'move', 'direction': [random.choice([-1,0,1]), random.choice([-1,0,1])]})
+    # One pass over the neighbors gathers both the flock center
+    # (cohesion) and the nearest bird (separation). The grid is a torus,
+    # so each neighbor is measured by its offset the short way round and
+    # the center is the mean offset rather than the mean raw position.
+    x, y = position
+    dims = model['environment']['dimensions']
+    w, h = dims['width'], dims['height']
+    sum_x = sum_y = count = 0
+    nearest_off = None
+    dist_to_nearest = 0
+    for a in agents_nearby:
+        if not a.alive:
+            continue
+        ax, ay = a['position']
+        ox = (ax - x + w // 2) % w - w // 2
+        oy = (ay - y + h // 2) % h - h // 2
+        sum_x += ox
+        sum_y += oy
+        count += 1
+        d = abs(ox) + abs(oy)
+        if nearest_off is None or d < dist_to_nearest:
+            nearest_off, dist_to_nearest = (ox, oy), d
+
+    if not count:
+        actions.append({'type': 'move', 'direction': random.choice(STEPS)})
         return actions
 
-    # Average position of neighbors (cohesion target)
-    avg_x = sum(a['position'][0] for a in flock) / len(flock)
-    avg_y = sum(a['position'][1] for a in flock) / len(flock)
-
-    # Separation: avoid nearest bird
-    nearest = min(flock, key=lambda a: abs(a['position'][0] - position[0]) + abs(a['position'][1] - position[1]))
-    nearest_pos = nearest['position']
-    dist_to_nearest = abs(nearest_pos[0] - position[0]) + abs(nearest_pos[1] - position[1])
+    avg_x = sum_x / count
+    avg_y = sum_y / count
 
     dx, dy = 0, 0
 
     if dist_to_nearest <= 1:
         # Too close: separate (move away from nearest)
-        dx = 1 if position[0] > nearest_pos[0] else (-1 if position[0] < nearest_pos[0] else 0)
-        dy = 1 if position[1] > nearest_pos[1] else (-1 if position[1] < nearest_pos[1] else 0)
+        dx = -1 if nearest_off[0] > 0 else (1 if nearest_off[0] < 0 else 0)
+        dy = -1 if nearest_off[1] > 0 else (1 if nearest_off[1] < 0 else 0)
     else:
         # Cohesion: move toward flock center
-        dx = 1 if avg_x > position[0] else (-1 if avg_x < position[0] else 0)
-        dy = 1 if avg_y > position[1] else (-1 if avg_y < position[1] else 0)
+        dx = 1 if avg_x > 0 else (-1 if avg_x < 0 else 0)
+        dy = 1 if avg_y > 0 else (-1 if avg_y < 0 else 0)
 
     # Add some randomness (alignment noise)
     if random.random() < 0.2:
-        dx = random.choice([-1, 0, 1])
-        dy = random.choice([-1, 0, 1])
+        dx, dy = random.choice(STEPS)
 
     actions.append({'type': 'move', 'direction': [dx, dy]})
     return actions
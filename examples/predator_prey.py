@@ -14,6 +14,14 @@ from agentstan.analysis import analyze_population
 from agentstan.experiment import sweep
 
 rabbit_code = """
+# The grid is a torus, so offsets to other agents take the short way round
+def torus_offset(frm, to, model):
+    dims = model['environment']['dimensions']
+    w, h = dims['width'], dims['height']
+    dx = (to[0] - frm[0] + w // 2) % w - w // 2
+    dy = (to[1] - frm[1] + h // 2) % h - h // 2
+    return dx, dy
+
 def rabbit_behavior(agent, model, agents_nearby):
     actions = []
     energy = agent['energy']
@@ -27,12 +35,12 @@ def rabbit_behavior(agent, model, agents_nearby):
     wolves = [a for a in agents_nearby if a.type == 'wolf' and a.alive]
     if wolves:
         def wdist(w):
-            wp = w['position']
-            return abs(position[0] - wp[0]) + abs(position[1] - wp[1])
+            ox, oy = torus_offset(position, w['position'], model)
+            return abs(ox) + abs(oy)
         nearest = min(wolves, key=wdist)
-        w = nearest['position']
-        dx = 1 if position[0] > w[0] else -1
-        dy = 1 if position[1] > w[1] else -1
+        ox, oy = torus_offset(position, nearest['position'], model)
+        dx = 1 if ox < 0 else -1
+        dy = 1 if oy < 0 else -1
         actions.append({'type': 'move', 'direction': [dx, dy]})
     else:
         actions.append({'type': 'move', 'direction': [random.choice([-1,0,1]), random.choice([-1,0,1])]})
@@ -51,6 +59,14 @@ def rabbit_behavior(agent, model, agents_nearby):
 """
 
 wolf_code = """
+# The grid is a torus, so offsets to other agents take the short way round
+def torus_offset(frm, to, model):
+    dims = model['environment']['dimensions']
+    w, h = dims['width'], dims['height']
+    dx = (to[0] - frm[0] + w // 2) % w - w // 2
+    dy = (to[1] - frm[1] + h // 2) % h - h // 2
+    return dx, dy
+
 def wolf_behavior(agent, model, agents_nearby):
     actions = []
     energy = agent['energy']
@@ -60,8 +76,8 @@ def wolf_behavior(agent, model, agents_nearby):
     rabbits = [a for a in agents_nearby if a.type == 'rabbit' and a.alive]
     if rabbits:
         def dist(r):
-            rp = r['position']
-            return abs(position[0] - rp[0]) + abs(position[1] - rp[1])
+            ox, oy = torus_offset(position, r['position'], model)
+            return abs(ox) + abs(oy)
         prey = min(rabbits, key=dist)
         prey_pos = prey['position']
         d = dist(prey)
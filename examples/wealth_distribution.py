@@ -130,7 +130,9 @@ def run_single():
     print("Final wealth distribution (top 10 / bottom 10):")
     print(f"  Richest 10: {final_wealths[:10]}")
     print(f"  Poorest 10: {final_wealths[-10:]}")
-    print(f"  Top 10% own: {sum(final_wealths[:10]) / sum(final_wealths):.0%} of total wealth")
+    total_wealth = sum(final_wealths)
+    if total_wealth:
+        print(f"  Top 10% own: {sum(final_wealths[:10]) / total_wealth:.0%} of total wealth")
 
 
 if __name__ == "__main__":
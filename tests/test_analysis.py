@@ -1,6 +1,7 @@
 """Tests for the analysis module."""
 from agentstan import Simulation
 from agentstan.analysis import analyze_population, analyze_events
+from agentstan.analysis.events import _analyze_deaths
 
 
 SPEC = {
@@ -52,3 +53,10 @@ def test_event_analysis():
     assert report["total_events"] >= 0
     assert "deaths" in report
     assert "births" in report
+
+
+def test_death_rate_windows_cover_every_death():
+    deaths = [{"type": "agent_death", "step": s} for s in (1, 9, 10, 25, 30)]
+    rate = _analyze_deaths(deaths)["death_rate"]
+    assert [w["step_range"] for w in rate] == ["0-10", "10-20", "20-30", "30-40"]
+    assert [w["deaths"] for w in rate] == [2, 1, 1, 1]
@@ -1,5 +1,14 @@
 """Tests for the core simulation engine."""
+import csv
+import datetime
+import io
+import json
+
+import pytest
 from agentstan import Simulation, Agent, DataCollector
+from agentstan.core import jsonio
+from agentstan.core.agent import AgentManager
+from agentstan.core.environment import Environment
 from agentstan.core.scheduler import RandomScheduler, StagedScheduler, SimultaneousScheduler
 
 SPEC = {
@@ -93,3 +102,302 @@ def test_data_collector():
     assert "total_agents" in data[0]
     assert "avg_energy" in data[0]
     assert "count_rabbit" in data[0]
+
+
+def test_proximity_wraps_on_torus():
+    env = Environment("grid_2d", {"width": 20, "height": 20, "topology": "torus"})
+    manager = AgentManager()
+    a = Agent("dot", {"position": (0, 10)})
+    b = Agent("dot", {"position": (19, 10)})
+    manager.add_agent(a)
+    manager.add_agent(b)
+    manager.rebuild_spatial_index(env)
+
+    assert manager.get_agents_near_agent(a, 2, env) == [b]
+
+
+def test_distance_sq_matches_distance():
+    env = Environment("grid_2d", {"width": 10, "height": 10, "topology": "torus"})
+    assert env.distance_sq((0, 0), (9, 2)) == 5
+    assert abs(env.distance((0, 0), (9, 2)) ** 2 - 5) < 1e-9
+
+
+def test_random_neighbor_with_zero_radius_is_none():
+    for topology in ("torus", "bounded"):
+        env = Environment("grid_2d", {"width": 10, "height": 10, "topology": topology})
+        assert env.get_random_neighbor((5, 5), radius=0) is None
+        assert env.get_random_neighbor((5, 5), radius=1) is not None
+
+
+def test_cyclic_property_keeps_cycling():
+    env = Environment("grid_2d", {"width": 5, "height": 5}, properties={
+        "season": {"type": "cyclic", "period": 4, "values": ["summer", "winter"]},
+    })
+    seasons = []
+    for step in range(1, 9):
+        env.update(step)
+        seasons.append(env.get_property("season"))
+    assert seasons == ["summer", "winter", "winter", "summer"] * 2
+
+    env.set_property("season", "spring")
+    env.update(9)
+    assert env.get_property("season") == "spring"
+
+
+def test_event_log_write_jsonl():
+    sim = Simulation(SPEC)
+    sim.run(3)
+    buf = io.StringIO()
+    written = sim.logger.write_jsonl(buf)
+    lines = buf.getvalue().splitlines()
+    assert written == len(lines) == len(sim.logger.events)
+    assert json.loads(lines[0])["type"] == sim.logger.events[0]["type"]
+
+
+def test_event_log_write_csv():
+    sim = Simulation(SPEC)
+    sim.run(3)
+    buf = io.StringIO()
+    assert sim.logger.write_csv(buf) == len(sim.logger.events)
+    rows = list(csv.DictReader(io.StringIO(buf.getvalue())))
+    assert len(rows) == len(sim.logger.events)
+    assert list(rows[0])[:3] == ["step", "timestamp", "event_type"]
+    assert rows[-1]["event_type"] == sim.logger.events[-1]["type"]
+
+
+def test_behavior_code_compiled_once():
+    code = SPEC["agent_types"]["rabbit"]["behavior_code"]
+    f1 = Simulation._compile_behavior_function("rabbit", code)
+    f2 = Simulation._compile_behavior_function("rabbit", code)
+    assert f1 is not f2
+    assert f1.__code__ is f2.__code__
+
+
+def test_save_load_round_trip(tmp_path):
+    sim = Simulation(SPEC)
+    sim.run(3)
+    path = str(tmp_path / "checkpoint.json")
+    sim.save(path)
+
+    loaded = Simulation.load(path)
+    assert loaded.step == sim.step
+    assert loaded.agent_manager.get_counts() == sim.agent_manager.get_counts()
+    first = loaded.agent_manager.agents[0]
+    assert first["energy"] == sim.agent_manager.agents[0]["energy"]
+    assert first.behavior_function is not None
+    loaded.run(2)
+
+
+class _LabelledSimulation(Simulation):
+    def __init__(self, specification, label="run"):
+        super().__init__(specification)
+        self.label = label
+
+    def _setup(self, specification, scheduler=None):
+        super()._setup(specification, scheduler)
+        self.label = "run"
+
+
+def test_subclass_can_load(tmp_path):
+    path = str(tmp_path / "checkpoint.json")
+    _LabelledSimulation(SPEC).save(path)
+
+    loaded = _LabelledSimulation.load(path)
+    assert isinstance(loaded, _LabelledSimulation)
+    assert loaded.label == "run"
+    assert loaded.agent_manager.get_total_count() == 35
+    assert loaded.metrics["history"] == []
+
+
+def test_behavior_builtins_are_read_only():
+    code = "def probe_behavior(agent, model, agents_nearby):\n    __builtins__['len'] = None\n"
+    func = Simulation._compile_behavior_function("probe", code)
+    with pytest.raises(TypeError):
+        func(None, {}, [])
+
+
+def test_agent_state_is_independent_copy():
+    shared = {"energy": 5, "position": (1, 2), "inventory": ["seed"]}
+    a = Agent("dot", shared)
+    b = Agent("dot", {"energy": 5, "position": (1, 2)})
+    a["inventory"].append("stone")
+    a["energy"] = 9
+    assert shared == {"energy": 5, "position": (1, 2), "inventory": ["seed"]}
+    assert b.state is not a.state
+    assert a.to_dict()["state"]["inventory"] is not a["inventory"]
+
+
+def test_minimal_log_level_skips_move_events():
+    spec = {
+        "environment": {"type": "grid_2d", "dimensions": {"width": 10, "height": 10}},
+        "log_level": "minimal",
+        "agent_types": {
+            "walker": {
+                "initial_count": 5,
+                "behavior_code": (
+                    "def walker_behavior(agent, model, agents_nearby):\n"
+                    "    return [{'type': 'move', 'direction': [1, 0]},\n"
+                    "            {'type': 'move_to', 'target': (0, 0)},\n"
+                    "            {'type': 'move_random'}]\n"
+                ),
+            },
+        },
+    }
+    sim = Simulation(spec)
+    calls = []
+    sim.logger.log_agent_action = lambda *args, **kwargs: calls.append(kwargs)
+    sim.run(3)
+    assert calls == []
+    assert not any(e["type"] == "agent_action" for e in sim.logger.events)
+
+
+def test_move_to_takes_short_way_round_torus():
+    spec = {
+        "environment": {"type": "grid_2d", "dimensions": {"width": 20, "height": 20, "topology": "torus"}},
+        "agent_types": {
+            "chaser": {
+                "initial_count": 1,
+                "initial_state": {"position": (1, 10)},
+                "behavior_code": (
+                    "def chaser_behavior(agent, model, agents_nearby):\n"
+                    "    return [{'type': 'move_to', 'target': (18, 10)}]\n"
+                ),
+            },
+        },
+    }
+    sim = Simulation(spec)
+    sim.run(2)
+    assert sim.agent_manager.agents[0]["position"] == (19, 10)
+
+
+def test_move_stays_inside_bounded_grid():
+    env = Environment("grid_2d", {"width": 10, "height": 8, "topology": "bounded"})
+    assert env.normalize_position((-1, 8)) == (0, 7)
+    assert env.normalize_position((4, 3)) == (4, 3)
+
+
+def test_run_stream_reports_recorded_counts():
+    sim = Simulation(SPEC)
+    states = list(sim.run_stream(3, delay=0))
+    assert [s["step"] for s in states] == [1, 2, 3]
+    for state, recorded in zip(states, sim.metrics["history"]):
+        assert state["agent_counts"] == recorded["agent_counts"]
+        assert state["total_agents"] == sum(state["agent_counts"].values())
+
+
+def test_data_collector_write_csv():
+    collector = DataCollector(agent_metrics={"energy": lambda a: a.get_attribute("energy")})
+    sim = Simulation(SPEC)
+    sim.add_collector(collector)
+    sim.run(3)
+
+    buf = io.StringIO()
+    assert collector.write_csv(buf) == len(collector.get_model_data())
+    rows = list(csv.DictReader(io.StringIO(buf.getvalue())))
+    assert rows[0]["step"] == "1"
+    assert int(rows[0]["count_rabbit"]) == collector.get_model_data()[0]["count_rabbit"]
+
+    buf = io.StringIO()
+    assert collector.write_csv(buf, agent_level=True) == len(collector.get_agent_data())
+    assert buf.getvalue().splitlines()[0] == "step,agent_id,agent_type,energy"
+
+
+class _CullCollector:
+    """Kills one rabbit per step, after the step's metrics are recorded."""
+
+    def collect(self, simulation):
+        rabbits = simulation.agent_manager.get_agents_by_type("rabbit")
+        if rabbits:
+            rabbits[0].kill()
+
+
+def test_data_collector_counts_after_earlier_collectors():
+    collector = DataCollector()
+    sim = Simulation(SPEC)
+    sim.add_collector(_CullCollector())
+    sim.add_collector(collector)
+    sim.run(5)
+
+    for row, recorded in zip(collector.get_model_data(), sim.metrics["history"]):
+        assert row["count_rabbit"] == recorded["agent_counts"]["rabbit"] - 1
+        assert row["total_agents"] == recorded["total_agents"] - 1
+    assert collector.get_model_data()[-1]["count_rabbit"] == sim.agent_manager.get_counts()["rabbit"]
+
+
+def test_run_stream_counts_include_collector_changes():
+    sim = Simulation(SPEC)
+    sim.add_collector(_CullCollector())
+    for state in sim.run_stream(3, delay=0):
+        assert state["agent_counts"] == sim.agent_manager.get_counts()
+        assert state["total_agents"] == sim.agent_manager.get_total_count()
+
+
+class _ExtinctionCollector:
+    """Kills every agent once the step's metrics are recorded."""
+
+    def collect(self, simulation):
+        for agent in simulation.agent_manager.get_living_agents():
+            agent.kill()
+
+
+def test_run_stops_when_collectors_empty_population():
+    sim = Simulation(SPEC)
+    sim.add_collector(_ExtinctionCollector())
+    results = sim.run(5)
+    assert results["final_step"] == 1
+    assert results["summary"]["final_agents"] == 0
+
+
+def test_jsonio_dumps_with_and_without_orjson(monkeypatch):
+    when = datetime.datetime(2024, 1, 2, 3, 4, 5)
+    data = {"counts": {"wolf": 3}, "position": (1, 2), "tags": {"x"}, "when": when}
+    expected = {"counts": {"wolf": 3}, "position": [1, 2], "tags": "{'x'}", "when": str(when)}
+    assert json.loads(jsonio.dumps(data, indent=True)) == expected
+    monkeypatch.setattr(jsonio, "orjson", None)
+    assert json.loads(jsonio.dumps(data)) == expected
+
+
+def test_save_load_keeps_non_finite_state(tmp_path):
+    spec = {
+        "environment": {"type": "grid_2d", "dimensions": {"width": 5, "height": 5}},
+        "agent_types": {
+            "scout": {
+                "initial_count": 1,
+                "initial_state": {"best": float("inf"), "worst": float("-inf"), "score": None},
+                "behavior_code": "def scout_behavior(agent, model, agents_nearby):\n    return []\n",
+            },
+        },
+    }
+    path = str(tmp_path / "checkpoint.json")
+    Simulation(spec).save(path)
+
+    state = Simulation.load(path).agent_manager.agents[0].state
+    assert state["best"] == float("inf")
+    assert state["worst"] == float("-inf")
+    assert state["score"] is None
+
+
+def test_behavior_cannot_change_counts_seen_by_later_agents():
+    spec = {
+        "environment": {"type": "grid_2d", "dimensions": {"width": 5, "height": 5}},
+        "agent_types": {
+            "meddler": {
+                "initial_count": 4,
+                "behavior_code": (
+                    "def meddler_behavior(agent, model, agents_nearby):\n"
+                    "    agent['seen'] = model['agent_counts']['meddler']\n"
+                    "    model['agent_counts']['meddler'] = 0\n"
+                    "    return []\n"
+                ),
+            },
+        },
+    }
+    sim = Simulation(spec)
+    sim.run_step()
+    assert [a["seen"] for a in sim.agent_manager.agents] == [4, 4, 4, 4]
+
+
+def test_unknown_environment_type_rejected_early():
+    spec = dict(SPEC, environment={"type": "hex_grid"})
+    with pytest.raises(ValueError, match="hex_grid"):
+        Simulation(spec)
@@ -51,3 +51,19 @@ def test_sweep():
     )
     assert set(results.keys()) == {5, 10, 15}
     assert all(len(runs) == 2 for runs in results.values())
+
+
+def test_batch_run_does_not_mutate_spec_properties():
+    spec = dict(SPEC, environment={
+        "type": "grid_2d",
+        "dimensions": {"width": 10, "height": 10},
+        "properties": {"season": {"type": "cyclic", "period": 4, "values": ["a", "b"]}},
+    })
+    batch_run(spec, n_runs=2, steps=3, max_workers=2)
+    assert spec["environment"]["properties"]["season"]["type"] == "cyclic"
+
+
+def test_batch_run_in_processes():
+    results = batch_run(SPEC, n_runs=2, steps=5, max_workers=2, processes=True)
+    assert [r["run_id"] for r in results] == [0, 1]
+    assert all(r["final_step"] == 5 for r in results)
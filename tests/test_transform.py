@@ -112,3 +112,46 @@ def test_transform_with_inline_behavior_code():
     overriders = sim.agent_manager.get_agents_by_type("overrider")
     assert len(overriders) == 1
     assert overriders[0].get_attribute("tag") == "ran"
+
+
+def test_inline_behavior_code_compiled_once_per_simulation():
+    code = "def overrider_behavior(a, m, n):\n    return []\n"
+    spec = {
+        "environment": {"type": "grid_2d", "dimensions": {"width": 10, "height": 10}},
+        "agent_types": {
+            "starter": {
+                "initial_count": 3,
+                "initial_state": {},
+                "behavior_code": (
+                    "def starter_behavior(agent, model, agents_nearby):\n"
+                    f"    return [{{'type': 'transform', 'new_type': 'overrider', 'behavior_code': {code!r}}}]\n"
+                ),
+            },
+        },
+    }
+    sim = Simulation(spec)
+    sim.run_step()
+
+    overriders = sim.agent_manager.get_agents_by_type("overrider")
+    assert len(overriders) == 3
+    assert len({a.behavior_function for a in overriders}) == 1
+
+
+def test_transform_to_wrong_arity_behavior_keeps_running():
+    spec = {
+        "environment": {"type": "grid_2d", "dimensions": {"width": 10, "height": 10}},
+        "agent_types": {
+            "larva": {
+                "initial_count": 3,
+                "behavior_code": (
+                    "def larva_behavior(agent, model, agents_nearby):\n"
+                    "    return [{'type': 'transform', 'new_type': 'moth',\n"
+                    "             'behavior_code': 'def moth_behavior(agent):\\n    return []\\n'}]\n"
+                ),
+            },
+        },
+    }
+    sim = Simulation(spec)
+    results = sim.run(3)
+    assert results["final_step"] == 3
+    assert sim.agent_manager.get_counts()["moth"] == 3